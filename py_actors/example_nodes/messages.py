@@ -14,16 +14,16 @@
 # limitations under the License.
 
 class Msg1:
-    pass
+    __slots__ = ()
 
 
 class Msg2:
-    pass
+    __slots__ = ()
 
 
 class Msg3:
-    pass
+    __slots__ = ()
 
 
 class Msg4:
-    pass
+    __slots__ = ()
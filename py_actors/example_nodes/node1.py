@@ -15,33 +15,34 @@
 
 import logging
 import time
-from random import random
 from lib_actors.node import Node
 from example_nodes.messages import *
+from example_nodes.utils import Draws, node_addr
 
 
 class Node1(Node):
     def __init__(self):
-        super().__init__('Node1', 'localhost', 5678, [Msg1, Msg2])
-        self.node.add_peer('Node2', 'localhost', 8765)
-        self.logger.setLevel(logging.NOTSET)
+        super().__init__('Node1', node_addr('node1'), 5678, [Msg1, Msg2])
+        self.node.add_peer('Node2', node_addr('node2'), 8765)
+        self.set_log_level(logging.NOTSET)
         self.count = 0
+        self.random = Draws()
         self.scheduler.repeat(1000, self.pub)
         self.message.subscribe(self.sub1, Msg1)
         self.message.subscribe(self.sub2, Msg2)
 
     def pub(self):
-        rnd = random()
-        if rnd < 0.25:
-            self.logger.info("Sending Msg1 ...")
+        rnd = self.random.draw()
+        if rnd == 0:  # p = 0.25
+            self.log_info("Sending Msg1 ...")
             self.message.publish(Msg1())
         self.count += 1
 
     def sub1(self, msg: Msg1):
-        self.logger.info("Received Msg1 ...")
+        self.log_info("Received Msg1 ...")
 
     def sub2(self, msg: Msg2):
-        self.logger.info("Received Msg2 ...")
+        self.log_info("Received Msg2 ...")
 
 
 if __name__ == "__main__":
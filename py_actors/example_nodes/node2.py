@@ -15,38 +15,39 @@
 
 import logging
 import time
-from random import random
 from lib_actors.node import Node
 from example_nodes.messages import *
+from example_nodes.utils import Draws, node_addr
 
 
 class Node2(Node):
     def __init__(self):
-        super().__init__('Node2', 'localhost', 8765, [Msg1, Msg2, Msg3, Msg4])
-        self.node.add_peer('Node1', 'localhost', 5678)
-        self.node.add_peer('Node3', 'localhost', 6789)
-        self.logger.setLevel(logging.NOTSET)
+        super().__init__('Node2', node_addr('node2'), 8765, [Msg1, Msg2, Msg3, Msg4])
+        self.node.add_peer('Node1', node_addr('node1'), 5678)
+        self.node.add_peer('Node3', node_addr('node3'), 6789)
+        self.set_log_level(logging.NOTSET)
 
         self.count = 0
+        self.random = Draws()
         self.scheduler.repeat(1000, self.pub)
         self.message.subscribe(self.sub1, Msg1)
         self.message.subscribe(self.sub3, Msg3)
 
     def pub(self):
-        rnd = random()
-        if rnd < 0.25:
-            self.logger.info("Sending Msg2 ...")
+        rnd = self.random.draw()
+        if rnd == 0:  # p = 0.25
+            self.log_info("Sending Msg2 ...")
             self.message.publish(Msg2())
-        elif rnd < 0.5:
-            self.logger.info("Sending Msg4 ...")
+        elif rnd == 1:  # p = 0.25
+            self.log_info("Sending Msg4 ...")
             self.message.publish(Msg4())
         self.count += 1
 
     def sub1(self, msg: Msg1):
-        self.logger.info("Received Msg1 ...")
+        self.log_info("Received Msg1 ...")
 
     def sub3(self, msg: Msg3):
-        self.logger.info("Received Msg3 ...")
+        self.log_info("Received Msg3 ...")
 
 
 if __name__ == "__main__":
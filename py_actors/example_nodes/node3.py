@@ -15,37 +15,38 @@
 
 import logging
 import time
-from random import random
 from lib_actors.node import Node
 from example_nodes.messages import *
+from example_nodes.utils import Draws, node_addr
 
 
 class Node3(Node):
     def __init__(self):
-        super().__init__('Node3', 'localhost', 6789, [Msg3, Msg4])
-        self.node.add_peer('Node2', 'localhost', 8765)
-        self.logger.setLevel(logging.NOTSET)
+        super().__init__('Node3', node_addr('node3'), 6789, [Msg3, Msg4])
+        self.node.add_peer('Node2', node_addr('node2'), 8765)
+        self.set_log_level(logging.NOTSET)
 
         self.count = 0
+        self.random = Draws()
         self.scheduler.repeat(1000, self.pub)
         self.message.subscribe(self.sub3, Msg3)
         self.message.subscribe(self.sub4, Msg4)
 
     def pub(self):
-        rnd = random()
-        if rnd < 0.25:
-            self.logger.info("Sending Msg3 ...")
+        rnd = self.random.draw()
+        if rnd == 0:  # p = 0.25
+            self.log_info("Sending Msg3 ...")
             self.message.publish(Msg3())
-        if rnd < 0.5:
-            self.logger.info("Sending Msg4 ...")
+        if rnd <= 1:  # p = 0.5
+            self.log_info("Sending Msg4 ...")
             self.message.publish(Msg4())
         self.count += 1
 
     def sub3(self, msg: Msg3):
-        self.logger.info("Received Msg3 ...")
+        self.log_info("Received Msg3 ...")
 
     def sub4(self, msg: Msg4):
-        self.logger.info("Received Msg4 ...")
+        self.log_info("Received Msg4 ...")
 
 
 if __name__ == "__main__":
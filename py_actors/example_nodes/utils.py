@@ -0,0 +1,47 @@
+# Copyright (c) 2023, Henrik Larsen
+# https://github.com/henrik7264/PY_Actors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import socket
+from random import getrandbits
+
+# Use Unix domain sockets between the nodes when the platform supports them, otherwise TCP on localhost.
+UNIX = hasattr(socket, 'AF_UNIX')
+
+
+def node_addr(name: str) -> str:
+    """
+    Returns the address of an example node, ex. 'unix:/tmp/node1.sock' for node_addr('node1').
+    """
+    return f'unix:/tmp/{name}.sock' if UNIX else 'localhost'
+
+
+class Draws:
+    """
+    Random draws with four equally likely values 0, 1, 2 and 3.
+    The random bits are fetched 64 at a time and consumed two per draw.
+    """
+
+    def __init__(self):
+        self.bits = 0  # Random bits, consumed two at a time.
+        self.draws = 0  # Number of draws left in self.bits.
+
+    def draw(self) -> int:
+        if self.draws == 0:
+            self.bits = getrandbits(64)
+            self.draws = 32
+        rnd = self.bits & 3
+        self.bits >>= 2
+        self.draws -= 1
+        return rnd
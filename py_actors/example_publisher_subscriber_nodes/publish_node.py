@@ -27,7 +27,7 @@ class Publisher(Node):
         self.scheduler.repeat(1000, self.pub)
 
     def pub(self):
-        self.message.publish(Message("Hello " + str(self.count)))
+        self.message.publish(Message(f"Hello {self.count}"))
         self.count += 1
 
 
@@ -13,17 +13,34 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import atexit
 import logging
-from reactivex import create, Observable
-from threading import Lock
+from queue import Queue
+from logging.handlers import QueueHandler, QueueListener
+from functools import partial
+from typing import TYPE_CHECKING
 from lib_actors.dispatcher import Dispatcher
+from lib_actors.mailbox import Mailbox
 from lib_actors.scheduler import Scheduler
 from lib_actors.timer import Timer
 
+if TYPE_CHECKING:
+    from reactivex import Observable
 
+
+# Log records are formatted by the QueueHandler and written to the file and terminal by the listener thread,
+# so a callback function never blocks on I/O when it logs.
+_log_queue = Queue()
+_log_listener = QueueListener(_log_queue, logging.FileHandler(filename="actors.log", mode="w"), logging.StreamHandler())
+_log_listener.start()
+atexit.register(_log_listener.stop)
 logging.basicConfig(level=logging.NOTSET,
                     format='%(asctime)s %(name)s %(levelname)s: %(message)s',
-                    handlers=[logging.FileHandler(filename="actors.log", mode="w"), logging.StreamHandler()])
+                    handlers=[QueueHandler(_log_queue)])
+
+
+def _no_log(*args, **kwargs):
+    pass
 
 
 class Actor:
@@ -50,9 +67,12 @@ class Actor:
 
         def pub(self):
             self.message.publish(MyMessage("Hello world"))
+
+    All call back functions of an Actor are executed one at a time by the mailbox of the Actor,
+    so the Actor never has to protect its own state with locks.
     """
 
-    def __init__(self, name: str, log_level: int = logging.CRITICAL):
+    def __init__(self, name: str, log_level: int = logging.CRITICAL, throughput: int = 16):
         """
         The initialization of an Actor.
 
@@ -63,25 +83,45 @@ class Actor:
 
         :param name: The name of the Actor. It must be a unique name that is easy to indentify in log message.
         :param log_level: The default log level is set to CRITICAL. Set it to logging.NOTSET to log everything.
+        :param throughput: The max. number of call back functions the Actor executes in a row before it yields (>= 1).
         """
-        self.lock = Lock()  # To ensure that call back functions are thread safe.
         self.name = name
         self.logger = logging.getLogger(name) 
+        self.log_info = _no_log  # logger.info if INFO is enabled, else a no-op. Set by set_log_level.
+        self.set_log_level(log_level)
+        self.mailbox = Mailbox(name, throughput)  # All call back functions of the Actor are executed by the mailbox.
+        self.message = Actor._Message(self.mailbox)
+        self.scheduler = Actor._Scheduler(self.mailbox)
+
+    def set_log_level(self, log_level: int) -> None:
+        """
+        Sets the log level of the Actor.
+        Use this function instead of self.logger.setLevel(...), so that self.log_info follows the log level.
+        self.log_info is self.logger.info when INFO is enabled and a no-op otherwise,
+        so a disabled log statement costs a single call.
+
+        Example:
+            self.set_log_level(logging.NOTSET)
+            self.log_info("Received a MyMessage: " + msg.data)
+
+        :param log_level: The log level. Set it to logging.NOTSET to log everything.
+        """
         self.logger.setLevel(log_level)
-        self.message = Actor._Message(self.lock)
-        self.scheduler = Actor._Scheduler(self.lock)
+        self.log_info = self.logger.info if self.logger.isEnabledFor(logging.INFO) else _no_log
 
     class _Message:
-        def __init__(self, lock: Lock):
+        def __init__(self, mailbox: Mailbox):
             """
             Do not create instances of this class!
 
             Access the scheduler functions using the following constructs:
                 self.message.subscribe(...)
                 self.message.publish(...)
+                self.message.publish_many(...)
                 self.message.stream(...)
             """
-            self.actor_lock = lock
+            self.mailbox = mailbox
+            self.dispatcher = Dispatcher.get_instance()
 
         def subscribe(self, func, msg_type):
             """
@@ -99,17 +139,12 @@ class Actor:
             :param func: A lambda or callback function. The function must take a message argument of the specified type.
             :return
             """
-            def _locked_func(msg):
-                with self.actor_lock:
-                    func(msg)
-            return Dispatcher.get_instance().register_cb(_locked_func, msg_type)
+            return self.dispatcher.register_cb(partial(self.mailbox.post, func), msg_type)
 
-        @staticmethod
-        def unsubscribe(sub_id, msg_type) -> None:
-            Dispatcher.get_instance().unregister_cb(sub_id, msg_type)
+        def unsubscribe(self, sub_id, msg_type) -> None:
+            self.dispatcher.unregister_cb(sub_id, msg_type)
 
-        @staticmethod
-        def publish(msg) -> None:
+        def publish(self, msg) -> None:
             """
             Message function - The Actor will publish the specified message.
 
@@ -118,9 +153,22 @@ class Actor:
 
             :param msg: The message (instance of a class) to be published.
             """
-            Dispatcher.get_instance().publish(msg)
+            self.dispatcher.publish(msg)
+
+        def publish_many(self, msgs) -> None:
+            """
+            Message function - The Actor will publish the specified messages.
+            Publishing a burst of messages at once is cheaper than publishing them one by one.
+            Messages of the same type are received in the order of the list.
+
+            Example:
+                self.message.publish_many([MyMessage("Hello"), MyMessage("world")])
+
+            :param msgs: The messages (instances of classes) to be published.
+            """
+            self.dispatcher.publish_many(msgs)
 
-        def stream(self, msg_type) -> Observable:
+        def stream(self, msg_type) -> "Observable":
             """
             Message function - This function will return a rx.Observable stream
             of messages of the specified message type.
@@ -131,13 +179,15 @@ class Actor:
 
             :param msg_type: A reference to a class/message.
             """
+            from reactivex import create  # Imported on first use. Actors that do not use streams do not load reactivex.
+
             def _stream(observer, scheduler=None):
-                self.subscribe(msg_type, lambda msg: observer.on_next(msg))
+                self.subscribe(lambda msg: observer.on_next(msg), msg_type)
                 return observer
             return create(_stream)
 
     class _Scheduler:
-        def __init__(self, lock: Lock):
+        def __init__(self, mailbox: Mailbox):
             """
             Do not create instances of this class!
 
@@ -146,7 +196,8 @@ class Actor:
                 self.scheduler.repeat(...)
                 self.scheduler.remove(...)
             """
-            self.actor_lock = lock
+            self.mailbox = mailbox
+            self.scheduler = Scheduler.get_instance()
 
         def once(self, msec: int, func) -> int:
             """
@@ -159,11 +210,7 @@ class Actor:
             :param func: call back function to be executed when the job times out.
             :return: job_id
             """
-            def _locked_func():
-                with self.actor_lock:
-                    func()
-
-            return Scheduler.get_instance().once(msec, _locked_func)
+            return self.scheduler.once(msec, partial(self.mailbox.post, func), inline=True)
 
         def repeat(self, msec: int, func) -> int:
             """
@@ -172,18 +219,13 @@ class Actor:
             Example:
                 job_id = self.scheduler.repeat(1000, self.func)
 
-            :param msec: timeout in milliseconds.
+            :param msec: timeout in milliseconds. It must be positive.
             :param func: call back function to be executed when the job times out.
             :return: job id
             """
-            def _locked_func():
-                with self.actor_lock:
-                    func()
-
-            return Scheduler.get_instance().repeat(msec, _locked_func)
+            return self.scheduler.repeat(msec, partial(self.mailbox.post, func), inline=True)
 
-        @staticmethod
-        def remove(job_id: int):
+        def remove(self, job_id: int):
             """
             Scheduler function - will delete the scheduled job.
 
@@ -194,7 +236,19 @@ class Actor:
 
             :param job_id: the job to be removed.
             """
-            Scheduler.get_instance().remove(job_id)
+            self.scheduler.remove(job_id)
+
+        def set_precision(self, precision_ns: int):
+            """
+            Scheduler function - will busy wait the last precision_ns of each timeout to get a more precise timeout.
+            The Scheduler is shared by all Actors, so the precision applies to all Actors.
+
+            Example:
+                self.scheduler.set_precision(1000000)  # Busy wait the last millisecond.
+
+            :param precision_ns: precision in nanoseconds, at most 100 ms. 0 disables busy waiting.
+            """
+            self.scheduler.set_precision(precision_ns)
 
         def timer(self, msec: int, func):
-            return Timer(self.actor_lock, msec, func)
+            return Timer(self.mailbox, msec, func)
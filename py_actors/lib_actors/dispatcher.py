@@ -14,24 +14,28 @@
 # limitations under the License.
 
 import os
-from queue import Queue
+from queue import SimpleQueue
 from threading import Thread, Lock
 
 
 class Worker(Thread):
     def __init__(self):
         super().__init__(daemon=True)
-        self.worker_queue = Queue()
+        self.worker_queue = SimpleQueue()  # A C implemented queue without the locking overhead of Queue.
         self.start()
 
     def run(self):
+        get = self.worker_queue.get
         while True:
-            func, arg = self.worker_queue.get()
-            func(arg)
+            funcs, msgs = get()  # All callback functions and all messages of a publish in one item.
+            for msg in msgs:
+                for func in funcs:
+                    func(msg)
 
 
 Workers: [Worker] = []
-No_Workers: int = os.cpu_count()
+No_Workers: int = 1 << ((os.cpu_count() or 1) - 1).bit_length()  # The number of CPUs rounded up to a power of two.
+Worker_Mask: int = No_Workers - 1  # hash(msg_type) & Worker_Mask selects the worker of a message type.
 for i in range(No_Workers):  # Start the workers.
     Workers.append(Worker())
 
@@ -58,8 +62,13 @@ class Dispatcher:
         """
         Do not create instances of this class! Dispatcher is a singleton.
         """
-        self.lock = Lock()  # To ensure that subscribe and publish function are executed in a thread safe manner
+        self.lock = Lock()  # To ensure that subscribe and unsubscribe are executed in a thread safe manner
         self.cb_dict = {}  # List of functions/callbacks for each message type {Type1: {id1: cb1, id2: cb2}, Type2: {id3: cb3}}
+        # A read only snapshot of cb_dict used by publish {Type1: (put1, (cb1, cb2)), Type2: (put2, (cb3,))},
+        # where put is the put function of the worker queue that handles the message type.
+        # It is never modified, but replaced by a new snapshot on each subscribe/unsubscribe,
+        # so publish can read it without taking the lock.
+        self.cb_tuples = {}
 
     @staticmethod
     def get_instance():
@@ -71,10 +80,14 @@ class Dispatcher:
 
         :return: an instance of the Dispatcher class.
         """
-        if Dispatcher.__instance__ is None:
-            Dispatcher.__instance__ = Dispatcher()
         return Dispatcher.__instance__
 
+    @staticmethod
+    def _entry(msg_type, func_dict: dict) -> tuple:
+        # The worker is looked up once per subscribe instead of once per publish.
+        # All messages of a type are handled by the same worker, so they reach the subscribers in publish order.
+        return Workers[hash(msg_type) & Worker_Mask].worker_queue.put, tuple(func_dict.values())
+
     def register_cb(self, func, msg_type) -> int:
         """
         An Actor can subscribe to a message and get a callback function executed each time a message is published.
@@ -92,9 +105,10 @@ class Dispatcher:
             func_id = id(func) + id(msg_type)
             func_dict = self.cb_dict.get(msg_type)
             if func_dict is None:
-                self.cb_dict[msg_type] = {func_id: func}
+                func_dict = self.cb_dict[msg_type] = {func_id: func}
             else:
                 func_dict[func_id] = func
+            self.cb_tuples = {**self.cb_tuples, msg_type: Dispatcher._entry(msg_type, func_dict)}
             return func_id
 
     def unregister_cb(self, func_id: int, msg_type):
@@ -102,8 +116,13 @@ class Dispatcher:
             func_dict = self.cb_dict.get(msg_type)
             if func_dict is not None:
                 func_dict.pop(func_id)
+                cb_tuples = dict(self.cb_tuples)
                 if not func_dict:
                     self.cb_dict.pop(msg_type)
+                    cb_tuples.pop(msg_type)
+                else:
+                    cb_tuples[msg_type] = Dispatcher._entry(msg_type, func_dict)
+                self.cb_tuples = cb_tuples
 
     def publish(self, msg):
         """
@@ -117,10 +136,38 @@ class Dispatcher:
 
         :param msg: The message (instance of a class) to be published.
         """
-        with self.lock:
+        entry = self.cb_tuples.get(type(msg))  # No lock needed. The snapshot is replaced, never modified.
+        if entry is not None:
+            put, funcs = entry
+            put((funcs, (msg,)))  # One put per message, not one per subscriber.
+
+    def publish_many(self, msgs):
+        """
+        The publish_many function publishes a number of messages at once.
+        The messages are grouped by message type and all messages of a type
+        are handed to the Workers as one item. Messages of the same type are
+        received in the order of the list. Messages of different types may
+        (as with publish) be received in any order.
+
+        Example:
+            dispatcher.publish_many([MyMessage("Hello"), MyMessage("world")])
+
+        :param msgs: The messages (instances of classes) to be published.
+        """
+        msgs_by_type = {}
+        for msg in msgs:
             msg_type = type(msg)
-            func_dict = self.cb_dict.get(msg_type)
-            if func_dict is not None:
-                worker = Workers[id(msg_type) % No_Workers]
-                for func in func_dict.values():
-                    worker.worker_queue.put((func, msg))
+            same_type = msgs_by_type.get(msg_type)
+            if same_type is None:
+                msgs_by_type[msg_type] = [msg]
+            else:
+                same_type.append(msg)
+        cb_tuples = self.cb_tuples
+        for msg_type, same_type in msgs_by_type.items():
+            entry = cb_tuples.get(msg_type)
+            if entry is not None:
+                put, funcs = entry
+                put((funcs, same_type))
+
+
+Dispatcher.__instance__ = Dispatcher()  # Created on import, so two threads never create a Dispatcher each.
@@ -0,0 +1,88 @@
+# Copyright (c) 2023, Henrik Larsen
+# https://github.com/henrik7264/PY_Actors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+from time import sleep
+from collections import deque
+from threading import Thread, Event
+
+# Failing callback functions are logged here and not by the logger of the Actor,
+# as the log level of an Actor is CRITICAL by default and the error would be lost.
+_logger = logging.getLogger(__name__)
+
+
+class Mailbox(Thread):
+    """
+    The Mailbox is a helper class to Actors and should as such never be used directly!
+
+    Each Actor owns a Mailbox. The callback functions of an Actor (subscriptions, scheduled jobs,
+    timers and statemachine transitions) are not executed by the Dispatcher or the Scheduler.
+    They are posted to the Mailbox of the Actor and executed one at a time by the Mailbox thread.
+    This ensures that the callback functions of an Actor are executed sequentially without any locks.
+
+    The Mailbox is a multiple producer, single consumer queue. Appending to a deque is atomic and takes no lock.
+    A producer only takes the lock of the wake up Event when the Mailbox thread is waiting for work,
+    so producers posting to a busy Mailbox never block each other.
+
+    The Mailbox executes at most throughput callback functions in a row before it yields to the other threads
+    (the same knob as the throughput of an Akka dispatcher). A busy Actor can in this way not starve the other Actors.
+    """
+
+    def __init__(self, name: str, throughput: int = 16):
+        """
+        Do not create instances of this class! A Mailbox is created by the Actor.
+
+        :param name: The name of the Actor owning the Mailbox.
+        :param throughput: The max. number of callback functions executed before the mailbox yields. At least 1.
+        """
+        if throughput < 1:
+            raise ValueError(f"The throughput of a mailbox must be at least 1, not {throughput}.")
+        super().__init__(name=name, daemon=True)
+        self.throughput = throughput
+        self.mbox = deque()  # [(func1, args1), (func2, args2), ...]
+        self.wake = Event()  # Set when a callback function is posted to the mailbox and the Mailbox thread waits.
+        self.start()
+
+    def post(self, func, *args) -> None:
+        """
+        Posts a callback function to the mailbox. The function is executed by the Mailbox thread.
+
+        Example:
+            mailbox.post(self.func, msg)
+
+        :param func: A lambda or callback function.
+        :param args: The arguments of the callback function.
+        """
+        self.mbox.append((func, args))
+        if not self.wake.is_set():  # The Mailbox thread clears wake before it empties the mailbox.
+            self.wake.set()
+
+    def run(self):
+        mbox, wake, batch = self.mbox, self.wake, range(self.throughput)
+        popleft = mbox.popleft
+        while True:
+            wake.wait()
+            wake.clear()
+            for _ in batch:
+                if not mbox:
+                    break
+                func, args = popleft()
+                try:
+                    func(*args)
+                except Exception:  # A failing callback function must not stop the Actor.
+                    _logger.exception(f"Callback function {func} of {self.name} failed.")
+            if mbox:  # Yield to the other threads before the next batch is executed.
+                wake.set()
+                sleep(0)
@@ -1,89 +1,159 @@
+import os
+import stat
 import time
 import socket
 import pickle
-from threading import Thread, Lock
+import struct
+from queue import Queue
+from threading import Thread, Lock, Condition
 from lib_actors.actor import Actor
 
 
-def _send_str(sock: socket.socket, v: str):
-    s = '#' + str(len(v)) + ':' + v
-    sock.sendall(s.encode())
+MAX_SEND_BATCH = 64  # Max. number of messages sent to a peer in one system call.
+UNIX_PREFIX = 'unix:'  # Addresses with this prefix are Unix domain socket paths, ex. 'unix:/tmp/node1.sock'.
+PICKLE_PROTOCOL = 4  # Highest pickle protocol supported by all Python versions this library runs on (>= 3.4).
+RECV_BUFFER_SIZE = 65536  # Size of the buffered reader of a connection.
+SOCK_BUFFER_SIZE = 1 << 20  # Size of the kernel send and receive buffers of TCP connections.
+RECONNECT_MIN_DELAY = 0.1  # Delay in seconds before the first retry of a failed connect.
+RECONNECT_MAX_DELAY = 2.0  # The delay is doubled on each failed connect up to this value.
+HANDSHAKE_TIMEOUT = 5.0  # Seconds a connecting peer has to complete the handshake before it is disconnected.
+MAX_FRAME_SIZE = 64 << 20  # Max. size of a pickled message. A peer sending a larger frame is disconnected.
+MAX_HANDSHAKE_FRAME_SIZE = 1024  # Max. size of each string of the handshake.
+_HEADER = struct.Struct('>I')  # Each frame starts with its size as a 4 byte big endian integer.
 
 
-def _send_int(sock: socket.socket, v: int):
-    _send_str(sock, str(v))
+def _is_unix(addr: str) -> bool:
+    return addr.startswith(UNIX_PREFIX)
 
 
-def _send_msg(sock: socket.socket, msg):
-    pickled = pickle.dumps(msg)
-    pickled_size = len(pickled)
-    pickled_header = "#" + str(pickled_size) + ":"
-    sock.sendall(pickled_header.encode())
-    sock.sendall(pickled)
+def _create_sock(addr: str) -> socket.socket:
+    if _is_unix(addr):
+        return socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    return socket.socket(socket.AF_INET, socket.SOCK_STREAM)
 
 
-def _recv_bytes(sock: socket.socket):
-    s: str = ''
-    c: str = ''
-    while c != ':' or s == '':  # look for string with format '#<digits>:'
-        while c != '#':  # find start of string
-            c = sock.recv(1).decode()
-        c = sock.recv(1).decode()
-        s = ''
-        while c.isdigit():  # read digits
-            s += c
-            c = sock.recv(1).decode()
-    expt_size: int = int(s)
-    recv_size: int = 0
+def _set_buffer_sizes(sock: socket.socket):
+    # Must be set before connect or listen. The TCP window scale is negotiated when the connection is set up.
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCK_BUFFER_SIZE)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCK_BUFFER_SIZE)
+
+
+def _set_no_delay(sock: socket.socket):
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)  # Small messages are sent without Nagle delay.
+
+
+def _remove_stale_sock(path: str):
+    # Removes the socket file left by a previous run. A file that is not a socket or a socket in use is kept.
+    try:
+        mode = os.lstat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(f"{path} exists and is not a Unix domain socket.")
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except (ConnectionRefusedError, FileNotFoundError):  # Nobody listens on the socket.
+        os.unlink(path)
+        return
+    finally:
+        probe.close()
+    raise OSError(f"{path} is used by a running node.")
+
+
+def _sock_addr(addr: str, port: int):
+    if _is_unix(addr):
+        return addr[len(UNIX_PREFIX):]  # The port is not used by Unix domain sockets.
+    return addr, port
+
+
+def _send_strs(sock: socket.socket, strs):
+    chunks: [bytes] = []
+    for v in strs:
+        b = str(v).encode()
+        chunks.append(_HEADER.pack(len(b)))
+        chunks.append(b)
+    sock.sendall(bytes().join(chunks))  # All strings are sent in one system call.
+
+
+def _send_msgs(sock: socket.socket, msgs):
     chunks: [bytes] = []
-    while recv_size < expt_size:
-        chunk: bytes = sock.recv(min(expt_size - recv_size, 2048))
-        if chunk is None:
-            raise socket.error()
-        chunks.append(chunk)
-        recv_size += len(chunk)
-    return bytes().join(chunks)
+    for msg in msgs:
+        pickled = pickle.dumps(msg, PICKLE_PROTOCOL)
+        chunks.append(_HEADER.pack(len(pickled)))
+        chunks.append(pickled)
+    sock.sendall(bytes().join(chunks))  # All messages are sent in one system call.
 
 
-def _recv_str(sock: socket.socket) -> str:
-    return _recv_bytes(sock).decode()
+def _recv_bytes(reader, max_size: int) -> bytes:
+    header = reader.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        raise ConnectionError("Connection closed by peer.")
+    size, = _HEADER.unpack(header)
+    if size > max_size:  # The size is checked before anything is read, as the peer is not trusted.
+        raise ConnectionError(f"Frame of {size} bytes exceeds {max_size} bytes.")
+    data = reader.read(size)
+    if len(data) < size:
+        raise ConnectionError("Connection closed by peer.")
+    return data
 
 
-def _recv_int(sock: socket.socket) -> int:
-    return int(_recv_bytes(sock).decode())
+def _recv_str(reader) -> str:
+    return _recv_bytes(reader, MAX_HANDSHAKE_FRAME_SIZE).decode()
 
 
-def _recv_msg(sock: socket.socket) -> bytes:
-    return pickle.loads(_recv_bytes(sock))
+def _recv_int(reader) -> int:
+    return int(_recv_bytes(reader, MAX_HANDSHAKE_FRAME_SIZE).decode())
+
+
+def _recv_msg(reader):
+    return pickle.loads(_recv_bytes(reader, MAX_FRAME_SIZE))
 
 
 class PeerNode(Thread):
-    def __init__(self, node, sock, name: str, addr: str, port: int, msgs):
+    def __init__(self, node, sock, reader, name: str, addr: str, port: int, msgs):
         super().__init__(daemon=True)
         self.node = node
         self.sock = sock
+        self.reader = reader  # Buffered reader of sock. Frames are parsed from it without a system call per byte.
         self.do_reconnect = (sock is None)
         self.is_connected = (sock is not None)
         self.name = name
         self.addr = addr
         self.port = port
         self.msgs = msgs
+        self.msg_types = frozenset(msgs)  # For the type check of each received message.
         self.msgs_to_drop = []
-        self.subs = []
-        for msg_type in msgs:
-            self.subs.append((self.node.message.subscribe(self.send_to_peer, msg_type), msg_type))
+        self.send_queue = Queue()  # Messages waiting to be sent to the peer. None stops the sender.
+        self.subs = tuple((self.node.message.subscribe(self.send_to_peer, msg_type), msg_type) for msg_type in msgs)
+        Thread(target=self.sender, daemon=True).start()
         self.start()
 
     def send_to_peer(self, msg):
         if msg in self.msgs_to_drop:
             self.msgs_to_drop.remove(msg)
-        else:
+        elif self.is_connected:
+            self.send_queue.put(msg)
+
+    def sender(self):
+        msgs = []
+        while True:
+            msg = self.send_queue.get()
+            if msg is None:
+                return
+            msgs.append(msg)
+            if len(msgs) < MAX_SEND_BATCH and not self.send_queue.empty():
+                continue  # Coalesce the queued messages into one system call.
             try:
                 if self.is_connected:
-                    _send_msg(self.sock, msg)
+                    _send_msgs(self.sock, msgs)
             except socket.error:
-                self.sock.close()
                 self.is_connected = False
+                try:
+                    self.sock.shutdown(socket.SHUT_RDWR)  # Wakes up run, which closes the connection.
+                except socket.error:
+                    pass
+            msgs = []
 
     def run(self):
         do_loop = True
@@ -95,46 +165,53 @@ class PeerNode(Thread):
                     else:
                         for sub, msg_type in self.subs:
                             self.node.message.unsubscribe(sub, msg_type)
+                        self.send_queue.put(None)
                         do_loop = False
                 else:
-                    msg = _recv_msg(self.sock)
-                    if type(msg) in self.msgs:
+                    msg = _recv_msg(self.reader)
+                    if type(msg) in self.msg_types:
                         self.msgs_to_drop.append(msg)
                         self.node.message.publish(msg)
             except pickle.UnpicklingError as err:
                 self.node.logger.error(f"Pickle error: {err}.")
             except socket.error:
-                self.node.conns.pop(self.name)
+                with self.node.lock:
+                    self.node.conns.pop(self.name, None)
+                    self.node.conns_changed.notify_all()  # Wakes up a PeerNode waiting to reconnect.
+                self.reader.close()
                 self.sock.close()
                 self.is_connected = False
 
     def reconnect(self):
+        delay = RECONNECT_MIN_DELAY
         while not self.is_connected:
-            while self.name in self.node.conns:
-                time.sleep(5.0)
+            with self.node.lock:
+                while self.name in self.node.conns:  # The peer is connected to us. Wait until it disconnects.
+                    self.node.conns_changed.wait()
 
             try:
-                self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
-                self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE,1)  # after idle in sec.
-                self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL,1)  # interval between keepalives
-                self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT,5)  # retries
-
-                self.sock.connect((self.addr, self.port))
-                _send_str(self.sock, "PY_Actors")
-                _send_str(self.sock, "v1.0.0")
-                _send_str(self.sock, self.node.name)
-                _send_str(self.sock, self.node.addr)
-                _send_int(self.sock, self.node.port)
+                self.sock = _create_sock(self.addr)
+                if not _is_unix(self.addr):
+                    self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+                    self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE,1)  # after idle in sec.
+                    self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL,1)  # interval between keepalives
+                    self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT,5)  # retries
+                    _set_no_delay(self.sock)
+                    _set_buffer_sizes(self.sock)
+
+                self.sock.connect(_sock_addr(self.addr, self.port))
+                _send_strs(self.sock, ("PY_Actors", "v1.1.0", self.node.name, self.node.addr, self.node.port))
                 with self.node.lock:
                     if self.name in self.node.conns:
                         self.sock.close()
                     else:
+                        self.reader = self.sock.makefile('rb', RECV_BUFFER_SIZE)
                         self.node.conns[self.name] = self
                         self.is_connected = True
             except socket.error:
                 self.sock.close()
-                time.sleep(1.0)
+                time.sleep(delay)
+                delay = min(2*delay, RECONNECT_MAX_DELAY)
 
 
 class Node(Thread, Actor):
@@ -154,27 +231,48 @@ class Node(Thread, Actor):
         self.peers: {PeerNode} = {}
         self.conns: {PeerNode} = {}
         self.lock = Lock()
+        self.conns_changed = Condition(self.lock)  # Notified when a connection is removed from conns.
         self.start()
 
     def run(self):
-        server_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        server_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        server_sock.bind((self.addr, self.port))
+        server_sock = _create_sock(self.addr)
+        if _is_unix(self.addr):
+            _remove_stale_sock(_sock_addr(self.addr, self.port))
+        else:
+            server_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            _set_buffer_sizes(server_sock)  # Inherited by the accepted connections.
+        server_sock.bind(_sock_addr(self.addr, self.port))
         server_sock.listen(8)
         while True:
             client_sock, client_addr = server_sock.accept()
-            with self.lock:
-                assert _recv_str(client_sock) == "PY_Actors"
-                assert _recv_str(client_sock) == "v1.0.0"
-                name = _recv_str(client_sock)
-                addr = _recv_str(client_sock)
-                port = _recv_int(client_sock)
-                if name in self.conns:
-                    client_sock.close()
-                else:
-                    self.conns[name] = PeerNode(self, client_sock, name, addr, port, self.msgs)
+            Thread(target=self.handshake, args=(client_sock,), daemon=True).start()  # A slow peer never blocks accept.
+
+    def handshake(self, client_sock: socket.socket):
+        if client_sock.family == socket.AF_INET:
+            _set_no_delay(client_sock)
+        client_sock.settimeout(HANDSHAKE_TIMEOUT)  # A peer that sends nothing must not keep the thread forever.
+        # The reader is handed over to the PeerNode, as it may already have buffered the first messages.
+        reader = client_sock.makefile('rb', RECV_BUFFER_SIZE)
+        try:
+            if _recv_str(reader) != "PY_Actors" or _recv_str(reader) != "v1.1.0":
+                raise ConnectionError("Not a PY_Actors v1.1.0 peer.")
+            name = _recv_str(reader)
+            addr = _recv_str(reader)
+            port = _recv_int(reader)
+            client_sock.settimeout(None)
+        except (socket.error, ValueError) as err:  # socket.timeout is a socket.error.
+            self.logger.error(f"Handshake failed: {err}.")
+            reader.close()
+            client_sock.close()
+            return
+        with self.lock:  # Only the update of conns is serialized.
+            if name in self.conns:
+                reader.close()
+                client_sock.close()
+            else:
+                self.conns[name] = PeerNode(self, client_sock, reader, name, addr, port, self.msgs)
 
     def add_peer(self, name: str, addr: str, port: int):
         if addr == 'localhost':
             addr = '127.0.0.1'
-        self.peers[name] = PeerNode(self, None, name, addr, port, self.msgs)
+        self.peers[name] = PeerNode(self, None, None, name, addr, port, self.msgs)
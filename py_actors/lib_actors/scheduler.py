@@ -14,20 +14,27 @@
 # limitations under the License.
 
 import sys
-from time import time
-from queue import Queue
+from itertools import count
+from heapq import heappush, heappop, heapreplace, heapify
+from time import monotonic_ns, sleep
+from queue import SimpleQueue
 from threading import Thread, Condition
 
 
+DEFERRABLE_RESOLUTION_NS = 100000000  # Deferrable jobs time out on the next multiple of this value (100 ms).
+MAX_PRECISION_NS = 100000000  # Max. busy wait of a timeout (100 ms). A larger value would keep the Scheduler spinning.
+
+
 class Worker(Thread):
     def __init__(self):
         super().__init__(daemon=True)
-        self.worker_queue = Queue()
+        self.worker_queue = SimpleQueue()  # A C implemented queue without the locking overhead of Queue.
         self.start()
 
     def run(self):
+        get = self.worker_queue.get
         while True:
-            func = self.worker_queue.get()
+            func = get()
             func()
 
 
@@ -39,14 +46,17 @@ class Scheduler(Thread):
     The Scheduler class schedules jobs (callback functions) to be executed at a specific time.
     The Scheduler supports jobs to be executed only one time or repeatedly.
 
-    A dictionary is used to store all information about the scheduled jobs.
-    The dictionary is walked through to determine if there are any jobs to be executed.
-    If so, the jobs will be executed immediately. If not, the scheduler will wait until
-    the next job is scheduled to be executed.
+    The scheduled jobs are stored in a heap ordered by their timeout, so the next job to be
+    executed is always the first job of the heap. If the job has timed out it will be executed
+    immediately. If not, the scheduler will wait until the job is scheduled to be executed.
+    A removed job is left in the heap and skipped when it reaches the top of the heap.
+
+    Jobs that only post a callback function to the mailbox of an Actor are executed inline by the Scheduler thread.
+    The other callback functions are executed by a Worker, so a slow function never delays the Scheduler.
 
-    The Scheduler makes use of a number of Workers to execute the callback functions.
-    The number of workers will adapt to the load of the Scheduler. When the size of the
-    worker queue exceeds a given number a new worker will be created.
+    The precision of the Scheduler is limited by the operating system (ex. ~15ms on Windows).
+    If a precision is set, the Scheduler will wait until precision_ns before the next timeout
+    and busy wait the remaining time. This trades CPU time for a more precise timeout.
     """
 
     __instance__ = None  # A Scheduler is a singleton.
@@ -57,8 +67,14 @@ class Scheduler(Thread):
         """
         super().__init__(daemon=True)
         self.condition = Condition()  # Control synchronisation of the scheduler
-        self.job_id = 0  # unique id that is returned each time a job is scheduled.
-        self.jobs = {}  # { job_id1: (timeout1, msec1, f1, repeat1), job_id2: (timeout2, msec2, f2, repeat2), ...}
+        self.job_id = count(1)  # next(self.job_id) returns a unique id each time a job is scheduled. No lock needed.
+        # A heap of jobs [[timeout1, job_id1, interval1, f1, repeat1, inline1], [timeout2, ...], ...]
+        # The timeout is a time.monotonic_ns() value and the interval is in nanoseconds.
+        # An inline job is executed by the Scheduler thread itself instead of by the Worker.
+        # A job is a list, so a repeated job is updated in place instead of being allocated again.
+        self.jobs = []
+        self.job_ids = set()  # The ids of the jobs that have not been removed or executed for the last time.
+        self.precision_ns = 0  # The last part of a timeout that is busy waited. 0 disables busy waiting.
         self.start()
 
     @staticmethod
@@ -71,63 +87,135 @@ class Scheduler(Thread):
 
         :return: an instance of the Scheduler class.
         """
-        if Scheduler.__instance__ is None:
-            Scheduler.__instance__ = Scheduler()
         return Scheduler.__instance__
 
     def run(self):
+        jobs = self.jobs
+        job_ids = self.job_ids
+        spin_until = 0
         while True:
+            while monotonic_ns() < spin_until:  # Busy wait the last part of a timeout without holding the lock.
+                sleep(0)
             with self.condition:
-                while not self.jobs:
+                while jobs and jobs[0][1] not in job_ids:  # Drop removed jobs from the top of the heap.
+                    heappop(jobs)
+                if not jobs:
                     self.condition.wait()
+                    continue
+
+                next_timeout = jobs[0][0]
+                wait_ns = next_timeout - monotonic_ns() - self.precision_ns
+                if wait_ns > 0:
+                    self.condition.wait(timeout=wait_ns/1.0e9)
+                    continue  # Jobs may have been added or removed while waiting.
+                if monotonic_ns() < next_timeout:
+                    spin_until = next_timeout
+                    continue  # The top of the heap is read again after the busy wait.
+
+                current_time = monotonic_ns()
+                while jobs and jobs[0][0] <= current_time:
+                    job = jobs[0]
+                    if job[1] not in job_ids:  # The job has been removed.
+                        heappop(jobs)
+                        continue
+                    if job[5]:
+                        job[3]()
+                    else:
+                        Worker.worker_queue.put(job[3])
+                    if job[4] > 1:
+                        job[0] += job[2]
+                        job[4] -= 1
+                        heapreplace(jobs, job)  # Moves the updated job down the heap in one operation.
+                    else:
+                        heappop(jobs)
+                        job_ids.discard(job[1])
 
-                next_timeout = sys.float_info.max
-                for job_id, (job_timeout, job_msec, job_func, job_repeat) in self.jobs.items():
-                    if job_repeat > 0 and job_timeout < next_timeout:
-                        next_timeout = job_timeout
-                current_time = time()
-                if next_timeout > current_time:
-                    self.condition.wait(timeout=next_timeout-current_time)
+    def set_precision(self, precision_ns: int):
+        """
+        Sets the precision of the Scheduler. The Scheduler will busy wait the last precision_ns of each timeout.
+        The precision applies to all jobs, i.e. to all Actors.
 
-                current_time = time()
-                for job_id, (job_timeout, job_msec, job_func, job_repeat) in self.jobs.items():
-                    if job_repeat > 0 and job_timeout <= current_time:
-                        Worker.worker_queue.put(job_func)
-                        self.jobs[job_id] = (job_timeout+float(job_msec)/1000.0, job_msec, job_func, job_repeat-1)
+        Example:
+            scheduler.set_precision(1000000)
 
-    def once(self, msec: int, func) -> int:
+        :param precision_ns: precision in nanoseconds, 0 to MAX_PRECISION_NS. 0 disables busy waiting.
+        """
+        if not 0 <= precision_ns <= MAX_PRECISION_NS:
+            raise ValueError(f"The precision must be 0 to {MAX_PRECISION_NS} ns, not {precision_ns} ns.")
+        with self.condition:
+            self.precision_ns = precision_ns
+            self.condition.notify()
+
+    def once(self, msec: int, func, deferrable: bool = False, inline: bool = False) -> int:
         """
         Starts a scheduler that after the specified timeout will execute the call back function.
+        The timeout of a deferrable job is rounded up to the next multiple of DEFERRABLE_RESOLUTION_NS,
+        so deferrable jobs that time out close to each other are executed in the same wake up of the Scheduler.
 
         Example:
             job_id = scheduler.once(1000, self.func)
 
         :param msec: timeout in milliseconds.
         :param func: call back function to be executed when the job times out.
+        :param deferrable: True if the job may be executed up to DEFERRABLE_RESOLUTION_NS nanoseconds too late.
+        :param inline: True if the function is executed by the Scheduler thread. It must return immediately.
         :return: job_id
         """
-        with self.condition:
-            self.job_id += 1
-            self.jobs[self.job_id] = (time()+float(msec)/1000.0, msec, func, 1)
-            self.condition.notify()
-            return self.job_id
+        return self._add(msec, func, 1, deferrable, inline)
 
-    def repeat(self, msec: int, func) -> int:
+    def repeat(self, msec: int, func, inline: bool = False) -> int:
         """
         Starts a scheduler that repeatedly at every timeout will execute the call back function.
 
         Example:
             job_id = scheduler.repeat(1000, self.func)
 
-        :param msec: timeout in milliseconds.
+        :param msec: timeout in milliseconds. It must be positive, as a job repeated without delay never ends.
         :param func: call back function to be executed when the job times out.
+        :param inline: True if the function is executed by the Scheduler thread. It must return immediately.
         :return: job id
         """
-        with self.condition:
-            self.job_id += 1
-            self.jobs[self.job_id] = (time()+float(msec)/1000.0, msec, func, sys.maxsize)
-            self.condition.notify()
-            return self.job_id
+        if int(msec*1000000) <= 0:  # The interval in nanoseconds, see _new_job.
+            raise ValueError(f"The timeout of a repeated job must be positive, not {msec} ms.")
+        return self._add(msec, func, sys.maxsize, False, inline)
+
+    def once_many(self, jobs, inline: bool = False) -> list:
+        """
+        Starts a number of schedulers, like once, with a single lock acquisition.
+
+        Example:
+            job_ids = scheduler.once_many([(1000, self.func1, False), (60000, self.func2, True)])
+
+        :param jobs: (msec, func, deferrable) for each job, see once.
+        :param inline: True if the functions are executed by the Scheduler thread. They must return immediately.
+        :return: the job ids in the order of jobs.
+        """
+        current_time = monotonic_ns()
+        new_jobs = [self._new_job(current_time, msec, func, 1, deferrable, inline) for msec, func, deferrable in jobs]
+        self._push(new_jobs)
+        return [job[1] for job in new_jobs]
+
+    def _add(self, msec: int, func, repeat: int, deferrable: bool, inline: bool) -> int:
+        job = self._new_job(monotonic_ns(), msec, func, repeat, deferrable, inline)
+        self._push((job,))
+        return job[1]
+
+    def _new_job(self, current_time: int, msec: int, func, repeat: int, deferrable: bool, inline: bool) -> list:
+        interval = int(msec*1000000)
+        timeout = current_time+interval
+        if deferrable:
+            timeout = -(-timeout // DEFERRABLE_RESOLUTION_NS) * DEFERRABLE_RESOLUTION_NS  # Rounded up.
+        return [timeout, next(self.job_id), interval, func, repeat, inline]
+
+    def _push(self, new_jobs):
+        with self.condition:  # Only the update of the heap is serialized.
+            jobs = self.jobs
+            head = jobs[0] if jobs else None
+            for job in new_jobs:
+                heappush(jobs, job)
+                self.job_ids.add(job[1])
+            if jobs and jobs[0] is not head:  # Only a job that times out before all other jobs changes the next timeout.
+                self.condition.notify()
 
     def remove(self, job_id: int):
         """
@@ -141,6 +229,33 @@ class Scheduler(Thread):
         :param job_id: the job to be removed.
         """
         with self.condition:
-            if job_id in self.jobs:
-                self.jobs.pop(job_id)
-                self.condition.notify()
+            # The job is dropped from the heap when it reaches the top. The scheduler is not notified,
+            # as the next timeout can only move later. At worst it wakes up once for the removed job.
+            self.job_ids.discard(job_id)
+            self._compact()
+
+    def remove_many(self, job_ids):
+        """
+        Stops and removes a number of scheduled jobs with a single lock acquisition.
+
+        Example:
+            job_ids = [scheduler.once(1000, self.func1), scheduler.once(2000, self.func2)]
+
+            self.scheduler.remove_many(job_ids)
+
+        :param job_ids: the jobs to be removed.
+        """
+        with self.condition:
+            self.job_ids.difference_update(job_ids)
+            self._compact()
+
+    def _compact(self):
+        # Removed jobs stay in the heap until their timeout. A timer that is restarted over and over would
+        # make the heap grow without bounds, so it is rebuilt when the removed jobs outnumber the other jobs.
+        jobs, job_ids = self.jobs, self.job_ids
+        if len(jobs) > 2*len(job_ids):
+            jobs[:] = [job for job in jobs if job[1] in job_ids]  # In place, as run holds a reference to the heap.
+            heapify(jobs)
+
+
+Scheduler.__instance__ = Scheduler()  # Created on import, so two threads never create a Scheduler each.
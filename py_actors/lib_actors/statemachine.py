@@ -13,24 +13,16 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import inspect
-from typing import cast
-from enum import Enum
-from threading import Lock
+from functools import partial
 from lib_actors.dispatcher import Dispatcher
 from lib_actors.scheduler import Scheduler
 
 
-class TransitionType(Enum):
-    MESSAGE = 0
-    TIMER = 1
-
-
 class Transition:
     """
     A statemachine is defined by an initial state and a number of states it can change to at any given time:
 
-    self.sm = Statemachine(Initial_state,
+    self.sm = Statemachine(self, Initial_state,
                     State(State_1,
                         Transition(...),
                         Transition(...)),
@@ -44,7 +36,9 @@ class Transition:
     The transition will finally change the state of the statemachine to the specified next_state.
     """
 
-    def __init__(self, transition_type: TransitionType, action=None, next_state=None):
+    __slots__ = ('action', 'next_state', 'statemachine')
+
+    def __init__(self, action=None, next_state=None):
         """
         Each State defines a number of Transitions that allow the statemachine to change from one state to another.
         A transition is identified by a trigger, an action and a next state operation. The trigger can either be a
@@ -62,12 +56,10 @@ class Transition:
                                  Message(CloseDoorMsg, action=self.close_door, next_state=States.DOOR_CLOSED),
                                  Timer(1000, action=self.auto_close_door, next_state=States.DOOR_CLOSED)))
 
-        :param transition_type: The type of the transition, either a Message or Timer.
         :param action: A callback function that is executed each time a transition is triggered.
         :param next_state: The next state of the statemachine. Set as part of a transition is triggered.
         """
 
-        self.transition_type = transition_type
         self.action = action
         self.next_state = next_state
         self.statemachine = None
@@ -83,12 +75,25 @@ class Transition:
         """
         self.statemachine = statemachine
 
+    def register_into(self, state):
+        """
+        Internal function - do not use!
+
+        Adds the transition to the list of its kind in the State. Implemented by Message and Timer.
+        A State can only hold transitions of these kinds.
+
+        :param state: The State owning the transition.
+        """
+        raise TypeError(f"State {state.state_name}: {type(self).__name__} is not a Message or Timer transition.")
+
 
 class Message(Transition):
     """
     A Message is a transition that is triggered by a message published by an Actor.
     """
 
+    __slots__ = ('msg_type',)
+
     def __init__(self, msg_type, action=None, next_state=None):
         """
         A Message is a transition that is triggered by a message published by an Actor.
@@ -104,24 +109,24 @@ class Message(Transition):
         :param action: A callback function that is executed when the transition is triggered.
         :param next_state: The next state of the statemachine when then transition is complete.
         """
-        super().__init__(transition_type=TransitionType.MESSAGE, action=action, next_state=next_state)
+        super().__init__(action=action, next_state=next_state)
         self.msg_type = msg_type
 
+    def register_into(self, state):
+        state.message_list.append((self, self.msg_type))
+
     def do_action(self, msg):
         """
         Internal function - do not use!
         Actual execution of the action callback function of the transition.
+        The Statemachine has looked up the transition for the current state. It is executed by the mailbox of the Actor.
 
         :param msg: A message published by an Actor.
         """
-        curr_state = self.statemachine.current_state
-        with self.statemachine.transition_lock:
-            if curr_state == self.statemachine.current_state:
-                if self.action is not None:
-                    with self.statemachine.actor_lock:
-                        self.action(msg)
-                if self.next_state is not None:
-                    self.statemachine.set_current_state(self.next_state)
+        if self.action is not None:
+            self.action(msg)
+        if self.next_state is not None:
+            self.statemachine.set_current_state(self.next_state)
 
 
 class Timer(Transition):
@@ -129,45 +134,56 @@ class Timer(Transition):
     A Timer is a transition that is triggered by a timer when it times out.
     """
 
-    def __init__(self, timeout: int, action=None, next_state=None):
+    __slots__ = ('timeout', 'deferrable')
+
+    def __init__(self, timeout: int, action=None, next_state=None, deferrable: bool = False):
         """
         A Timer is a transition that is triggered by a timer when it times out.
 
         The Timer must specify the timeout of the timer.
         It must also specify an action which is a callback function that called when the timer times out.
         Finally, it must specify a next state which the statemachine will be in the transition is complete.
+        A deferrable Timer may time out up to 100 ms too late. Deferrable Timers that time out close to each other
+        are triggered together, which is cheaper for timers where the exact timeout does not matter (ex. watchdogs).
 
         Example:
             Timer(1000, action=self.auto_close_door, next_state=States.DOOR_CLOSED),
+            Timer(60000, action=self.watchdog, deferrable=True),
 
         :param timeout: The timeout in milliseconds. When the timer times out the transition will be triggered.
         :param action: A callback function that is executed when the transition is triggered.
         :param next_state: The next state of the statemachine when then transition is complete.
+        :param deferrable: True if the timeout may be up to 100 ms too late.
         """
 
-        super().__init__(transition_type=TransitionType.TIMER, action=action, next_state=next_state)
+        super().__init__(action=action, next_state=next_state)
         self.timeout = timeout
+        self.deferrable = deferrable
 
-    def do_action(self):
+    def register_into(self, state):
+        state.timers_list.append(self)
+
+    def do_action(self, state_version: int):
         """
         Internal function - do not use!
         Actual execution of the action callback function of the transition.
+        The timer may have timed out just before the statemachine changed state. It is then ignored.
+
+        :param state_version: The state version of the statemachine when the timer was started.
         """
-        curr_state = self.statemachine.current_state
-        with self.statemachine.transition_lock:
-            if curr_state == self.statemachine.current_state:
-                if self.action is not None:
-                    with self.statemachine.actor_lock:
-                        self.action()
-                if self.next_state is not None:
-                    self.statemachine.set_current_state(self.next_state)
+        statemachine = self.statemachine
+        if state_version == statemachine.state_version:
+            if self.action is not None:
+                self.action()
+            if self.next_state is not None:
+                statemachine.set_current_state(self.next_state)
 
 
 class State:
     """
     A statemachine is defined by an initial state and then a number of states it can change to at any given time:
 
-    self.sm = Statemachine(Initial_state,
+    self.sm = Statemachine(self, Initial_state,
                     State(State_1,
                         Transition(...),
                         Transition(...)),
@@ -179,6 +195,8 @@ class State:
     The trigger is either a Message or Timer.
     """
 
+    __slots__ = ('state_name', 'transitions', 'message_list', 'timers_list', 'timer_jobs')
+
     def __init__(self, state_name, *transitions: Transition):
         """
         Each State defines a number of Transitions that allow the statemachine to change from one state to another.
@@ -202,13 +220,9 @@ class State:
         self.transitions = transitions  # The transitions of a state
         self.message_list = []  # [(MsgType1 Trans1), (MsgType2: Trans2), ...}
         self.timers_list = []  # [Trans3, Trans4 ...]
+        self.timer_jobs = ()  # ((timeout3, do_action3, deferrable3), ...) scheduled each time the State is entered.
         for trans in self.transitions:
-            if trans.transition_type == TransitionType.MESSAGE:
-                message = cast(Message, trans)
-                self.message_list.append((message, message.msg_type))
-            elif trans.transition_type == TransitionType.TIMER:
-                timer = cast(Timer, trans)
-                self.timers_list.append(timer)
+            trans.register_into(self)
 
     def set_statemachine(self, statemachine):
         """
@@ -220,6 +234,7 @@ class State:
         """
         for trans in self.transitions:
             trans.set_statemachine(statemachine)
+        self.timer_jobs = tuple((timer.timeout, timer.do_action, timer.deferrable) for timer in self.timers_list)
 
 
 class Statemachine:
@@ -231,7 +246,7 @@ class Statemachine:
 
     A statemachine is defined by an initial state and then a number of states it can change to at any given time:
 
-    self.sm = Statemachine(Initial_state,
+    self.sm = Statemachine(self, Initial_state,
                     State(State_1,
                         Transition(...),
                         Transition(...)),
@@ -243,7 +258,10 @@ class Statemachine:
     The trigger of a transition is either a Message or Timer.
     """
 
-    def __init__(self, initial_state, *states: State):
+    __slots__ = ('mailbox', 'current_state', 'state_id', 'state_version', 'states', 'state_dict',
+                 'scheduler', 'dispatcher', 'jobs', 'message_table', 'subscriptions')
+
+    def __init__(self, actor, initial_state, *states: State):
         """
         A statemachine is defined by an initial state and a number of states it can change to at any given time
 
@@ -251,32 +269,42 @@ class Statemachine:
             class States(Enum):
                 DOOR_OPENED = 0,
                 DOOR_CLOSED = 1
-            self.sm = Statemachine(States.DOOR_CLOSED,
+            self.sm = Statemachine(self, States.DOOR_CLOSED,
                            State(States.DOOR_CLOSED,
                                  Message(OpenDoorMsg, action=self.open_door, next_state=States.DOOR_OPENED)),
                            State(States.DOOR_OPENED,
                                  Message(CloseDoorMsg, action=self.close_door, next_state=States.DOOR_CLOSED),
                                  Timer(1000, action=self.auto_close_door, next_state=States.DOOR_CLOSED)))
 
+        :param actor: The Actor owning the Statemachine. The transitions are executed by the mailbox of the Actor.
         :param initial_state: The initial state of the Statemachine
         :param states: A number of states of the statemachine.
         """
-        actor = inspect.currentframe().f_back.f_locals["self"]  # Dirty trick to get the Actor instance.
-        assert hasattr(actor, "lock")
-        self.actor_lock = actor.lock  # Lock from Actor to synchronize callback functions.
-        self.transition_lock = Lock()
-        self.statemachine_lock = Lock()  # Lock to ensure statemachine synchronization.
-        self.current_state = None  # Current state of the Statemachine, typically an enum, i.e. integer
+        assert hasattr(actor, "mailbox")
+        # Mailbox of the Actor. All transitions and state changes are executed one at a time by the mailbox,
+        # so the statemachine needs no lock.
+        self.mailbox = actor.mailbox
+        self.current_state = initial_state  # Current state of the Statemachine, typically an enum, i.e. integer
+        # id() of the current state. Enum members hash by a Python function, a message_table key of ids does not.
+        self.state_id = id(initial_state)
+        self.state_version = 0  # Incremented each time a state is entered. Timers of a previous state are ignored.
         self.states = states  # The states of a statemachine
         self.state_dict = {}  # { name1: State1, name2: State2, ...}, name is typically an enum, i.e. integer
         self.scheduler = Scheduler.get_instance()
         self.dispatcher = Dispatcher.get_instance()
-        self.jobs = []  # [job_id1, job_id2, ...]
+        self.jobs = ()  # The timer jobs of the current state [job_id1, job_id2, ...] or () when it has none.
+        self.message_table = {}  # { (id(name1), MsgType1): Message1, (id(name2), MsgType2): Message2, ...}
         self.subscriptions = []  # [(sub_id1, msg_type1), (sub_id2, msg_type2) ...]
         for state in self.states:
             state.set_statemachine(self)
             self.state_dict[state.state_name] = state
-        self.set_current_state(initial_state)
+            for (message, msg_type) in state.message_list:
+                self.message_table[(id(state.state_name), msg_type)] = message
+        self.mailbox.post(self.set_current_state, None)  # The timers of the initial state are started by the mailbox.
+        # Subscribe once to all message types of the statemachine. The transition is looked up when a message arrives.
+        for msg_type in dict.fromkeys(msg_type for (state_name, msg_type) in self.message_table):
+            sub_id = self.dispatcher.register_cb(partial(self.mailbox.post, self.update), msg_type)
+            self.subscriptions.append((sub_id, msg_type))
 
     def get_current_state(self):
         """
@@ -287,8 +315,19 @@ class Statemachine:
 
         :return: Current state of the statemachine. Typically, an enum or integer.
         """
-        with self.statemachine_lock:
-            return self.current_state
+        return self.current_state  # No lock needed. Reading an attribute is atomic and the state is set in one step.
+
+    def update(self, msg):
+        """
+        Internal function - do not use!
+
+        Executes the Message transition of the current state that is triggered by the message (if any).
+
+        :param msg: A message published by an Actor.
+        """
+        message = self.message_table.get((self.state_id, type(msg)))
+        if message is not None:
+            message.do_action(msg)
 
     def set_current_state(self, new_state):
         """
@@ -296,25 +335,28 @@ class Statemachine:
 
         The function sets the current state of the statemachine.
         Only a Transition should set the current state of the statemachine.
+        Entering the current state again restarts its timers. A state without timers is left untouched.
 
-        :param new_state: The new/current state of the statemachine.
+        :param new_state: The new/current state of the statemachine. None restarts the timers of the current state.
         """
-        with self.statemachine_lock:
-            for job_id in self.jobs:
-                self.scheduler.remove(job_id)
-            self.jobs = []
-            for (sub_id, msg_type) in self.subscriptions:
-                self.dispatcher.unregister_cb(sub_id, msg_type)
-            self.subscriptions = []
-
-            if new_state is not None:
-                self.current_state = new_state
-
-            state = self.state_dict.get(self.current_state)
-            if state is not None:
-                for timer in state.timers_list:
-                    job_id = self.scheduler.once(timer.timeout, timer.do_action)
-                    self.jobs.append(job_id)
-                for (message, msg_type) in state.message_list:
-                    sub_id = self.dispatcher.register_cb(message.do_action, msg_type)
-                    self.subscriptions.append((sub_id, msg_type))
+        if new_state is self.current_state and not self.jobs:  # Identity. States are enums or other singletons.
+            return  # A transition to the same state without timers changes nothing.
+        if self.jobs:
+            self.scheduler.remove_many(self.jobs)  # All timers of the state are removed in one call.
+            self.jobs = ()
+
+        if new_state is not None:
+            self.current_state = new_state
+        self.state_version += 1
+
+        state = self.state_dict.get(self.current_state)
+        if state is None:
+            self.state_id = id(self.current_state)
+            return
+        self.current_state = state.state_name  # An equal state name is replaced by the one of the State.
+        self.state_id = id(self.current_state)
+        if state.timer_jobs:
+            post, state_version = self.mailbox.post, self.state_version
+            self.jobs = self.scheduler.once_many(
+                [(timeout, partial(post, do_action, state_version), deferrable)
+                 for timeout, do_action, deferrable in state.timer_jobs], inline=True)
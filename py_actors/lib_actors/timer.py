@@ -13,7 +13,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from threading import Lock
+from functools import partial
+from lib_actors.mailbox import Mailbox
 from lib_actors.scheduler import Scheduler
 
 
@@ -25,19 +26,23 @@ class Timer:
         t1 = self.scheduler.timer(...)
         t1.start()
         t1.stop()
+
+    A timer is started and stopped by the callback functions of its Actor,
+    which are executed one at a time by the mailbox, so the timer needs no lock.
     """
 
-    def __init__(self, actor_lock: Lock, msec: int, func):
-        self.actor_lock = actor_lock
-        self.timer_lock = Lock()
+    def __init__(self, mailbox: Mailbox, msec: int, func):
+        self.mailbox = mailbox
         self.msec = msec
         self.func = func
+        self.cb_func = partial(mailbox.post, func)  # Created once and reused each time the timer is started.
+        self.scheduler = Scheduler.get_instance()
         self.job_id = None
 
     def _stop(self):
-        if self.job_id is not None:
-            Scheduler.get_instance().remove(self.job_id)
-            self.job_id = None
+        job_id, self.job_id = self.job_id, None
+        if job_id is not None:
+            self.scheduler.remove(job_id)
 
     def start(self):
         """
@@ -46,13 +51,8 @@ class Timer:
         Example:
             t1.start()
         """
-        def _locked_func():
-            with self.actor_lock:
-                self.func()
-
-        with self.timer_lock:
-            self._stop()
-            self.job_id = Scheduler.get_instance().once(self.msec, _locked_func)
+        self._stop()
+        self.job_id = self.scheduler.once(self.msec, self.cb_func, inline=True)
 
     def stop(self):
         """
@@ -61,5 +61,4 @@ class Timer:
         Example:
             t1.stop()
         """
-        with self.timer_lock:
-            self._stop()
+        self._stop()